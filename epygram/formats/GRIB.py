@@ -179,16 +179,11 @@ class NamesGribDef(griberies.GribDef):
             defpaths.append(libpath)
         for d in defpaths[::-1]:
             for grib_edition in ('grib1', 'grib2'):
-                for concept in self._concepts:
-                    self._readConcept(concept, d, grib_edition)
+                dirpath = os.path.join(d, grib_edition)
+                if os.path.isdir(dirpath):
+                    self.read_dir(dirpath, grib_edition, self._concepts)
         self._initialized = True
 
-    def _readConcept(self, concept, directory,
-                     grib_edition=griberies.GribDef._default_grib_edition):
-        pathname = os.path.join(directory, grib_edition, concept + '.def')
-        if os.path.exists(pathname):
-            self.read(pathname, grib_edition)
-
     def name(self, fid,
              grib_edition=griberies.GribDef._default_grib_edition,
              include_comments=False,
@@ -54,16 +54,11 @@ class FaGribDef(griberies.GribDef):
         # read gribdef files
         for d in defpaths[::-1]:
             for grib_edition in ('grib1', 'grib2'):
-                for concept in self._concepts:
-                    self._read_localConcept(concept, d, grib_edition)
+                dirpath = os.path.join(d, grib_edition, 'localConcepts', 'lfpw')
+                if os.path.isdir(dirpath):
+                    self.read_dir(dirpath, grib_edition, self._concepts)
         self._initialized = True
 
-    def _read_localConcept(self, concept, directory,
-                           grib_edition=griberies.GribDef._default_grib_edition):
-        pathname = os.path.join(directory, grib_edition, 'localConcepts', 'lfpw', concept + '.def')
-        if os.path.exists(pathname):
-            self.read(pathname, grib_edition)
-
     @griberies.init_before
     def FA2GRIB(self, fieldname,
                 grib_edition=griberies.GribDef._default_grib_edition,
@@ -164,12 +159,11 @@ class FaGribDef(griberies.GribDef):
         finally:
             for f, gribfid in self.tables[grib_edition]['faFieldName'].items():
                 if partial_fieldname in f:
+                    gribfid = {k:v for k, v in gribfid.items()
+                               if include_comments or k != '#comment'}
+                    if filter_non_GRIB_keys:
+                        gribfid = self._filter_non_GRIB_keys(gribfid)
                     fields[f] = gribfid
-            for k, fid in fields.items():
-                if not include_comments:
-                    fid.pop('#comment', None)
-                if filter_non_GRIB_keys:
-                    fields[k] = self._filter_non_GRIB_keys(fid)
         return fields
 
     @griberies.init_before
@@ -191,10 +185,7 @@ class FaGribDef(griberies.GribDef):
                                     filter_non_GRIB_keys=filter_non_GRIB_keys)
 
     def __contains__(self, fid):
-        try:
-            if isinstance(fid, six.string_types):
-                fid = griberies.parse_GRIBstr_todict(fid)
-        except SyntaxError:  # fid is a FA fieldname
+        if isinstance(fid, six.string_types) and not griberies.is_GRIBstr(fid):  # fid is a FA fieldname
             try:
                 self.FA2GRIB(fid, fatal=True)
             except ValueError:
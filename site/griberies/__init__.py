@@ -6,13 +6,10 @@
 """
 Contains utilities around GRIB format.
 """
-from __future__ import print_function, absolute_import, unicode_literals, division
-import six
-
 import os
-import re
+import sys
 import io
-import copy
+import functools
 import subprocess
 
 from bronx.syntax.parsing import str2dict
@@ -20,12 +17,19 @@ from bronx.syntax.decorators import nicedeco
 
 from . import tables, defaults
 
+#: key for comments in grib defs (interned, as keys read from files)
+_COMMENT = sys.intern('#comment')
+#: characters allowed in real values of grib defs (no nan, inf, or 1_0)
+_REAL_CHARS = frozenset('0123456789.eE+-')
+#: marker of comments set apart while parsing grib defs
+_COMMENT_MARK = '\x00'
+
 
 def get_eccodes_from_ldconfig():
     """Get eccodes install directory from ldconfig."""
     out = str(subprocess.check_output(['/sbin/ldconfig', '-p']))
-    out_split = out.split(r'\n' if six.PY3 else str('\n'))
-    libs_eccodes = [lib for lib in out_split if str('libeccodes.so') in lib]
+    out_split = out.split(r'\n')
+    libs_eccodes = [lib for lib in out_split if 'libeccodes.so' in lib]
     paths = [lib.split('=>')[1].strip() for lib in libs_eccodes]
     dirs = set([os.path.sep.join(lib.split(os.path.sep)[:-2]) for lib in paths])
     assert len(dirs) == 1, "More than one 'libeccodes.so' has been found"
@@ -78,8 +82,8 @@ def complete_grib_samples_paths(rootdir, api_name, reset=False):
         sp = 'ECCODES_SAMPLES_PATH'
     loc_samples = [os.path.join(rootdir, 'share', api_name, 'samples')]
     if not reset and os.environ.get(sp, False):
-        loc_samples.append(os.environ.get(sp))
-    os.environ[sp] = os.pathsep.join(loc_samples)
+        loc_samples.extend(os.environ.get(sp).split(os.pathsep))
+    os.environ[sp] = os.pathsep.join(dict.fromkeys(loc_samples))  # remove duplicates, keeping order
 
 
 def complete_grib_definition_paths(rootdir, api_name, reset=False):
@@ -99,8 +103,8 @@ def complete_grib_definition_paths(rootdir, api_name, reset=False):
         dp = 'ECCODES_DEFINITION_PATH'
     loc_defs = [os.path.join(rootdir, 'share', api_name, 'definitions')]
     if not reset and os.environ.get(dp, False):
-        loc_defs.append(os.environ.get(dp))
-    os.environ[dp] = os.pathsep.join(loc_defs)
+        loc_defs.extend(os.environ.get(dp).split(os.pathsep))
+    os.environ[dp] = os.pathsep.join(dict.fromkeys(loc_defs))  # remove duplicates, keeping order
 
 
 def set_definition_path(path, api_name='eccodes', reset=False):
@@ -116,14 +120,19 @@ def set_definition_path(path, api_name='eccodes', reset=False):
     elif api_name == 'eccodes':
         dp = 'ECCODES_DEFINITION_PATH'
     if not reset and os.environ.get(dp, False):
-        paths.append(os.environ.get(dp))
-    os.environ[dp] = os.pathsep.join(paths)
+        paths.extend(os.environ.get(dp).split(os.pathsep))
+    os.environ[dp] = os.pathsep.join(dict.fromkeys(paths))  # remove duplicates, keeping order
+
+
+@functools.lru_cache(maxsize=32)
+def _split_paths(eccodes_paths, grib_paths):
+    paths = os.pathsep.join([eccodes_paths, grib_paths])
+    return tuple(p for p in paths.split(os.pathsep) if p not in ('', '.'))
 
 
 def _get_paths(obj):
-    paths = os.pathsep.join([os.environ.get('ECCODES_{}_PATH'.format(obj), ''),
-                             os.environ.get('GRIB_{}_PATH'.format(obj), '')])
-    return [p for p in paths.split(os.pathsep) if p not in ('', '.')]
+    return list(_split_paths(os.environ.get('ECCODES_{}_PATH'.format(obj), ''),
+                             os.environ.get('GRIB_{}_PATH'.format(obj), '')))
 
 
 def get_samples_paths():
@@ -142,60 +151,111 @@ def parse_GRIBstr_todict(strfid):
     return fid
 
 
+def is_GRIBstr(strfid):
+    """
+    Whether **strfid** is a GRIB fid string, to be parsed by
+    parse_GRIBstr_todict(), e.g. 'discipline=0,parameterCategory=1'.
+    """
+    return '=' in strfid or ':' in strfid
+
+
+def _split_comment(line):
+    """
+    Split **line** into code and comment, at the first '#' outside quotes.
+    Comment is None if there is none.
+    """
+    quote = None
+    for i, c in enumerate(line):
+        if quote is not None:
+            if c == quote:
+                quote = None
+        elif c in ('"', "'"):
+            quote = c
+        elif c == '#':
+            return line[:i], line[i + 1:]
+    return line, None
+
+
 def read_gribdef(filename):
-    """Read a grib definition file and return it as a dict."""
-    re_name = re.compile('("|\')(?P<name>[\w\.\-\_ ]+)("|\')\s*=')
-    re_real = '\+|-?\d*\.\d*e\+|-?\d*'
-    re_real_g = '(?P<real>' + re_real + ')'
-    re_int = '\+|-?\d+'
-    re_int_g = '(?P<int>' + re_int + ')'
-    # re_num = '(' + re_real + ')|(' + re_int + ')'
-    re_num_g = re_int_g + '|' + re_real_g
-    re_keyvalue = re.compile('(?P<key>\w+)\s*=\s*' + re_num_g + '\s*;')
+    """
+    Read a grib definition file and return it as a dict.
+    Keys and field names are interned, as they are a small vocabulary
+    repeated throughout tables.
+    """
     # read file
     with io.open(filename, 'r', encoding='utf-8') as f:
-        lines_unfold = [l.strip() for l in f.readlines()]
-        lines = []
-        for line in lines_unfold:
-            line = line.replace(';',';\n').replace('{ ','{\n')
-            line_split = [l.strip() for l in line.split('\n')]
-            lines.extend(line_split)
-    # find fields declaration
+        data = f.read()
+    # set comments apart, so that their contents cannot be taken for syntax:
+    # each comment is replaced by _COMMENT_MARK<n>, n being its index in comments
+    comments = []
+    if '#' in data:
+        lines = data.split('\n')
+        for i, line in enumerate(lines):
+            if '#' in line:
+                code, comment = _split_comment(line)
+                if comment is not None:
+                    lines[i] = '{}{}{}'.format(code, _COMMENT_MARK, len(comments))
+                    comments.append(comment.strip().strip('"'))
+        data = '\n'.join(lines)
+    # tokenize the whole buffer: each field is "[# comment] 'name' = { key = value; ... }"
     dico = {}
-    indexes = []
-    for i, line in enumerate(lines):
-        fmatch = re_name.match(line)
-        if fmatch:
-            field = fmatch.group('name')
-            indexes.append((field, i))
-            dico[field] = {}
-    # loop on fields
-    for (j, (field, istart)) in enumerate(indexes):
-        if j + 1 == len(indexes):  # last one
-            iend = len(lines)
-        else:
-            iend = indexes[j + 1][1]
-        if istart > 0 and lines[istart - 1].startswith("#"):  # this is a comment
-            dico[field]['#comment'] = lines[istart - 1][1:].strip().strip('"')
-        for i in range(istart, iend):
-            kvmatch = re_keyvalue.match(lines[i])
-            if kvmatch:
-                if kvmatch.groupdict().get('int'):
-                    dico[field][kvmatch.group('key')] = int(kvmatch.group('int'))
-                elif kvmatch.groupdict().get('real'):
-                    dico[field][kvmatch.group('key')] = float(kvmatch.group('real'))
+    for chunk in data.split('}'):
+        head, brace, body = chunk.partition('{')
+        if not brace:  # no more field
+            continue
+        head, _, declaration = head.rstrip().rpartition('\n')
+        declaration = declaration.strip()
+        if declaration[:1] not in ('"', "'"):  # not a field declaration
+            continue
+        field = sys.intern(declaration.split(declaration[0])[1])
+        fid = {}
+        comment = head.rpartition('\n')[2].strip()
+        if comment.startswith(_COMMENT_MARK):
+            fid[_COMMENT] = comments[int(comment[1:])]
+        for statement in body.split(';')[:-1]:
+            if _COMMENT_MARK in statement:  # remove comments
+                statement = '\n'.join([l.partition(_COMMENT_MARK)[0]
+                                       for l in statement.split('\n')])
+            key, _, value = statement.partition('=')
+            key = sys.intern(key.strip())
+            value = value.strip()
+            digits = value[1:] if value[:1] in ('+', '-') else value
+            if digits.isdecimal():  # integer
+                fid[key] = int(value)
+            elif value and set(value) <= _REAL_CHARS:  # real
+                try:
+                    fid[key] = float(value)
+                except ValueError:  # e.g. "1e", "+-"
+                    pass
+        # a field declared several times gets the keys of all its declarations
+        dico.setdefault(field, {}).update(fid)
     return dico
 
 
+@functools.lru_cache(maxsize=512)
+def _read_gribdef_cached(abspath, mtime_ns, size):
+    """
+    Memoized version of read_gribdef(), keyed by the file stats so that
+    a modified file is read again. Returned dict must not be modified.
+    """
+    return read_gribdef(abspath)
+
+
 class GribDef(object):
 
     _default_grib_edition = 'grib2'
     _non_GRIB_keys = []
+    #: look up key/value pairs through a reverse index (else, by scanning tables)
+    _reverse_index = True
 
     def __init__(self, actual_init=True, concepts=[]):
         self._concepts = set(concepts)
         self.tables = {'grib1':{c:{} for c in concepts},
                        'grib2':{c:{} for c in concepts}}
+        self._index = {'grib1':{}, 'grib2':{}}
+        self._key_freq = {'grib1':{}, 'grib2':{}}
+        # key/value lookups are cached per instance, and reset by read()
+        self._names_from_kv = functools.lru_cache(maxsize=4096)(self._names_from_kv)
         if actual_init:
             self._actual_init()
         else:
@@ -205,26 +265,127 @@ class GribDef(object):
         """Read necessary definition files."""
         pass
 
-    def read(self, filename, grib_edition=None):
-        """Read a grib def concept file, and update or register it."""
+    def read(self, filename, grib_edition=None, concept=None):
+        """
+        Read a grib def concept file, and update or register it.
+
+        :param grib_edition: among ('grib1', 'grib2'), the version of GRIB;
+            if None, guessed from **filename**
+        :param concept: the concept defined in file; if None, guessed from
+            **filename**
+        """
         if grib_edition is None:
             for g in ('grib1', 'grib2'):
                 if g in filename:
                     grib_edition = g
-        concept = os.path.basename(filename).replace('.def', '')
+        if concept is None:
+            concept = os.path.basename(filename).replace('.def', '')
+        st = os.stat(filename)
+        gribdef = _read_gribdef_cached(os.path.abspath(filename),
+                                       st.st_mtime_ns,
+                                       st.st_size)
+        gribdef = {f:{**fid} for f, fid in gribdef.items()}  # fids are flat dicts
         if concept in self.tables[grib_edition]:
-            self.tables[grib_edition][concept].update(read_gribdef(filename))
+            self.tables[grib_edition][concept].update(gribdef)
         else:
-            self.tables[grib_edition][concept] = read_gribdef(filename)
+            self.tables[grib_edition][concept] = gribdef
+        self._index[grib_edition].pop(concept, None)
+        self._key_freq[grib_edition].pop(concept, None)
+        self._names_from_kv.cache_clear()
+
+    def read_dir(self, dirpath, grib_edition=None, concepts=None):
+        """
+        Read all grib def concept files of a directory, and update or
+        register them.
+
+        :param grib_edition: among ('grib1', 'grib2'), the version of GRIB;
+            if None, guessed from **dirpath**
+        :param concepts: if given, only read the files of these concepts
+        """
+        if grib_edition is None:
+            for g in ('grib1', 'grib2'):
+                if g in dirpath:
+                    grib_edition = g
+        for entry in sorted(os.scandir(dirpath), key=lambda e: e.name):
+            if entry.name.endswith('.def') and entry.is_file():
+                concept = entry.name[:-len('.def')]
+                if concepts is None or concept in concepts:
+                    self.read(entry.path, grib_edition, concept=concept)
+
+    def _build_index(self, grib_edition, concept):
+        """
+        Build the reverse index of **concept** table, i.e. the list of field
+        names and, for each key and value, the set of the ranks of the fields
+        in which key has this value: {key:{value:{rank, ...}, ...}, ...}.
+        This is the transposition of the table, stored by key (column-major),
+        whereas the table is stored by field (row-major).
+        """
+        names = list(self.tables[grib_edition][concept].keys())
+        index = {}
+        for i, gribfid in enumerate(self.tables[grib_edition][concept].values()):
+            for k, v in gribfid.items():
+                index.setdefault(k, {}).setdefault(v, set()).add(i)
+        self._index[grib_edition][concept] = (names, index)
+
+    def _get_index(self, grib_edition, concept):
+        """Get the reverse index of **concept** table, building it if needed."""
+        if concept not in self._index[grib_edition]:
+            self._build_index(grib_edition, concept)
+        return self._index[grib_edition][concept]
+
+    def _names_from_index(self, handgrip, concept, grib_edition):
+        """Names of the fields of **concept** table containing **handgrip**."""
+        names, index = self._get_index(grib_edition, concept)
+        if len(handgrip) > 0:
+            ranks = set.intersection(*[index.get(k, {}).get(v, set())
+                                       for k, v in handgrip.items()])
+        else:
+            ranks = range(len(names))
+        return [names[i] for i in sorted(ranks)]
+
+    def _names_from_scan(self, handgrip, concept, grib_edition):
+        """
+        Names of the fields of **concept** table containing **handgrip**,
+        by scanning the table. Keys are compared from the least frequent
+        in table to the most frequent, so that fields get discarded early.
+        """
+        if concept not in self._key_freq[grib_edition]:
+            key_freq = {}
+            for gribfid in self.tables[grib_edition][concept].values():
+                for k in gribfid.keys():
+                    key_freq[k] = key_freq.get(k, 0) + 1
+            self._key_freq[grib_edition][concept] = key_freq
+        key_freq = self._key_freq[grib_edition][concept]
+        handgrip_keys = frozenset(handgrip)
+        handgrip_items = tuple(sorted(handgrip.items(),
+                                      key=lambda kv: key_freq.get(kv[0], 0)))
+        names = []
+        for f, gribfid in self.tables[grib_edition][concept].items():
+            if not handgrip_keys <= gribfid.keys():
+                continue
+            for k, v in handgrip_items:
+                if gribfid[k] != v:
+                    break
+            else:
+                names.append(f)
+        return names
+
+    def _names_from_kv(self, handgrip_items, concept, grib_edition):
+        """
+        Names of the fields of **concept** table containing the key/value
+        pairs of **handgrip_items** (a frozenset, to be hashable for caching).
+        """
+        handgrip = dict(handgrip_items)
+        if self._reverse_index:
+            names = self._names_from_index(handgrip, concept, grib_edition)
+        else:
+            names = self._names_from_scan(handgrip, concept, grib_edition)
+        return tuple(names)
 
     @classmethod
     def _filter_non_GRIB_keys(cls, fid):
         """Some keys are to be filtered out from gribdef."""
-        filtered_out = copy.copy(fid)
-        for k in cls._non_GRIB_keys:
-            if k in fid:
-                filtered_out.pop(k)
-        return filtered_out
+        return {k:v for k, v in fid.items() if k not in cls._non_GRIB_keys}
 
     @init_before
     def _lookup(self, fid, concept,
@@ -247,10 +408,7 @@ class GribDef(object):
             - if exact=False, return all the grib def which concept value
             contains **fid**
         """
-        try:
-            if isinstance(fid, six.string_types):
-                fid = parse_GRIBstr_todict(fid)
-        except SyntaxError:  # fid is a concept value
+        if isinstance(fid, str) and not is_GRIBstr(fid):  # fid is a concept value
             retrieved = self._lookup_from_conceptvalue(fid, concept,
                                                        grib_edition=grib_edition,
                                                        include_comments=include_comments,
@@ -279,15 +437,15 @@ class GribDef(object):
             present in grib def of field
         """
         if fid in self.tables[grib_edition][concept]:
-            fid = copy.copy(self.tables[grib_edition][concept][fid])
+            fid = {**self.tables[grib_edition][concept][fid]}
         else:
             if fatal:
                 raise KeyError('{} not found'.format(fid))
             else:
-                fid = copy.copy(self.tables[grib_edition][concept]['default'])
+                fid = {**self.tables[grib_edition][concept]['default']}
         if not include_comments:
-            if '#comment' in fid:
-                fid.pop('#comment', None)
+            if _COMMENT in fid:
+                fid.pop(_COMMENT, None)
         if filter_non_GRIB_keys:
             fid = self._filter_non_GRIB_keys(fid)
         return fid
@@ -325,12 +483,11 @@ class GribDef(object):
             if not exact:  # complete with all that contains fid
                 for f, gribfid in self.tables[grib_edition][concept].items():
                     if fid in f:
+                        gribfid = {k:v for k, v in gribfid.items()
+                                   if include_comments or k != _COMMENT}
+                        if filter_non_GRIB_keys:
+                            gribfid = self._filter_non_GRIB_keys(gribfid)
                         fields[f] = gribfid
-                for gribfid in fields.values():
-                    if not include_comments:
-                        gribfid.pop('#comment', None)
-                    if filter_non_GRIB_keys:
-                        gribfid = self._filter_non_GRIB_keys(gribfid)
             else:
                 if len(fields) == 1:
                     fields = fields[list(fields.keys())[0]]
@@ -350,23 +507,24 @@ class GribDef(object):
         :param filter_non_GRIB_keys: filter out the non-GRIB keys that may be
             present in grib def of field
         """
-        if isinstance(handgrip, six.string_types):
+        if isinstance(handgrip, str):
             handgrip = parse_GRIBstr_todict(handgrip)
+        # comments are not to be looked for
+        handgrip = {k:v for k, v in handgrip.items() if k != _COMMENT}
+        try:
+            handgrip_items = frozenset(handgrip.items())
+        except TypeError:  # unhashable value(s): can be neither cached nor indexed
+            names = self._names_from_scan(handgrip, concept, grib_edition)
+        else:
+            names = self._names_from_kv(handgrip_items, concept, grib_edition)
         fields = {}
-        for f, gribfid in self.tables[grib_edition][concept].items():
-            if set(handgrip.keys()).issubset(gribfid.keys()):
-                ok = True
-                for k,v in handgrip.items():
-                    if gribfid[k] != v:
-                        ok = False
-                        break
-                if ok:
-                    fields[f] = copy.copy(gribfid)
-        for k, fid in fields.items():
-            if not include_comments:
-                fid.pop('#comment', None)
+        for f in names:
+            gribfid = self.tables[grib_edition][concept][f]
+            fid = {k:v for k, v in gribfid.items()
+                   if include_comments or k != _COMMENT}
             if filter_non_GRIB_keys:
-                fields[k] = self._filter_non_GRIB_keys(fid)
+                fid = self._filter_non_GRIB_keys(fid)
+            fields[f] = fid
         return fields
 
     @init_before
@@ -395,9 +553,7 @@ class GribDef(object):
             concepts = [concept]
         values = set()
         for c in concepts:
-            for gribfid in self.tables[grib_edition][c].values():
-                if key in gribfid:
-                    values.add(gribfid[key])
+            values.update(self._get_index(grib_edition, c)[1].get(key, {}).keys())
         return sorted(values)
 
     def known_values(self,
@@ -415,8 +571,7 @@ class GribDef(object):
         all_keys = set()
         concepts = list(self.tables[grib_edition].keys())
         for c in concepts:
-            for gribfid in self.tables[grib_edition][c].values():
-                all_keys.update(set(gribfid.keys()))
-        if '#comment' in all_keys:
-            all_keys.remove('#comment')
+            all_keys.update(self._get_index(grib_edition, c)[1].keys())
+        if _COMMENT in all_keys:
+            all_keys.remove(_COMMENT)
         return all_keys
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Copyright (c) Météo France (2014-)
+# This software is governed by the CeCILL-C license under French law.
+# http://www.cecill.info
+
+from unittest import TestCase, main
+import os
+
+import griberies
+
+from .util import datadir
+
+filename = os.path.join(datadir, 'griberies', 'testConcept.def')
+
+
+class TestReadGribdef(TestCase):
+
+    def setUp(self):
+        self.gribdef = griberies.read_gribdef(filename)
+
+    def test_fields(self):
+        self.assertEqual(list(self.gribdef.keys()), ['T', 'U', 'Z', 'P', 'Q'])
+
+    def test_comments(self):
+        self.assertEqual(self.gribdef['T'],
+                         {'#comment':'Temperature {K}',
+                          'discipline':0,
+                          'parameterCategory':0,
+                          'typeOfFirstFixedSurface':103})
+        self.assertEqual(self.gribdef['Z']['#comment'], 'Multiplied level')
+
+    def test_oneline(self):
+        self.assertEqual(self.gribdef['U'], {'discipline':1})
+
+    def test_repeated(self):
+        self.assertEqual(self.gribdef['P'],
+                         {'discipline':0,
+                          'parameterNumber':52,
+                          'typeOfStatisticalProcessing':1})
+
+    def test_quoted_hashtag(self):
+        self.assertEqual(self.gribdef['Q'], {'discipline':3})
+
+    def test_values(self):
+        self.assertIsInstance(self.gribdef['Z']['ZLMULT'], float)
+        self.assertEqual(self.gribdef['Z']['ZLMULT'], 1e6)
+        self.assertNotIn('packingType', self.gribdef['Z'])
+        self.assertNotIn('level', self.gribdef['Z'])
+
+
+class TestGribDef(TestCase):
+
+    def setUp(self):
+        self.gribdef = griberies.GribDef(actual_init=False,
+                                         concepts=['testConcept'])
+        self.gribdef.read(filename, 'grib2')
+
+    def test_lookup_from_kv(self):
+        fields = self.gribdef._lookup_from_kv({'typeOfFirstFixedSurface':103},
+                                              'testConcept')
+        self.assertEqual(fields, {'T':{'discipline':0,
+                                       'parameterCategory':0,
+                                       'typeOfFirstFixedSurface':103}})
+        fields = self.gribdef._lookup_from_kv('discipline=0', 'testConcept',
+                                              include_comments=True)
+        self.assertEqual(fields['T']['#comment'], 'Temperature {K}')
+        self.assertEqual(self.gribdef._lookup_from_kv({'discipline':[0]},
+                                                      'testConcept'),
+                         {})
+
+    def test_lookup_from_conceptvalue(self):
+        fields = self.gribdef._lookup_from_conceptvalue('T', 'testConcept')
+        self.assertEqual(list(fields.keys()), ['T'])
+        self.assertNotIn('#comment', fields['T'])
+        fid = self.gribdef._lookup_from_conceptvalue('Z', 'testConcept',
+                                                     exact=True)
+        self.assertEqual(fid, {'discipline':2, 'ZLMULT':1e6})
+        # table is not altered by lookups
+        self.assertEqual(self.gribdef.tables['grib2']['testConcept']['T']['#comment'],
+                         'Temperature {K}')
+
+    def test_allkeys(self):
+        self.assertEqual(self.gribdef._allkeys(),
+                         {'discipline', 'parameterCategory',
+                          'typeOfFirstFixedSurface', 'ZLMULT',
+                          'parameterNumber', 'typeOfStatisticalProcessing'})
+
+
+if __name__ == '__main__':
+    main(verbosity=2)